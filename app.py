@@ -6,50 +6,158 @@ Upload transaction files and generate journal entries automatically
 
 from flask import Flask, render_template, request, send_file, flash, redirect, url_for
 import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from werkzeug.utils import secure_filename
-from datetime import datetime
+from datetime import date, datetime
 import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, NamedStyle
+from openpyxl.styles.borders import DEFAULT_BORDER
+from python_calamine import CalamineWorkbook, SheetTypeEnum, SheetVisibleEnum
 import re
+from functools import lru_cache
 from pathlib import Path
+from collections import namedtuple
+from itertools import islice
 from calendar import monthrange
 
 app = Flask(__name__)
 app.secret_key = 'dlocal-pending-debits-secret-key-2025'
-app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['OUTPUT_FOLDER'] = 'outputs'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
 # Create necessary folders
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
 
 ALLOWED_EXTENSIONS = {'xlsx', 'xls'}
 
+# Output workbooks are written in the background while the results page renders
+_EXECUTOR = ThreadPoolExecutor(max_workers=4)
+# output_filename -> Future for workbooks still being written, or whose write failed
+_PENDING_OUTPUTS = {}
+
+# Normalized header text -> internal column key
+HEADER_MAP = {
+    'date processed': 'date_processed',
+    'ach_debit_amount': 'debit_amount',
+    'ach_return_amount': 'return_amount',
+    'date': 'date',
+    'cn': 'cn',
+    'dn': 'dn'
+}
+
+# Spanish and English month names -> month number
+_MONTH_MAP = {
+    'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4,
+    'mayo': 5, 'junio': 6, 'julio': 7, 'agosto': 8,
+    'septiembre': 9, 'octubre': 10, 'noviembre': 11, 'diciembre': 12,
+    'january': 1, 'february': 2, 'march': 3, 'april': 4,
+    'may': 5, 'june': 6, 'july': 7, 'august': 8,
+    'september': 9, 'october': 10, 'november': 11, 'december': 12
+}
+# Month name or year in one alternation, so a single scan of the filename finds both
+_PERIOD_RE = re.compile('(' + '|'.join(_MONTH_MAP) + r')|(20\d{2})', re.IGNORECASE)
+_DATE_RE = re.compile(r'^(\d{1,4})[-/](\d{1,2})[-/](\d{1,4})$')
+
+# One input row; 'return_' avoids the Python keyword, and debit/return_ are parsed amounts or None
+Txn = namedtuple('Txn', 'date date_processed debit return_ cn dn is_following_month net')
+
+# Cell styles shared by every generated workbook
+HEADER_FONT = Font(name='Calibri', size=11, bold=True, color='000000')
+NORMAL_FONT = Font(name='Calibri', size=11, color='000000')
+BOLD_FONT = Font(name='Calibri', size=11, bold=True)
+ITALIC_FONT = Font(name='Calibri', size=11, italic=True)
+TITLE_FONT = Font(name='Calibri', size=14, bold=True)
+JE_TITLE_FONT = Font(name='Calibri', size=12, bold=True)
+BORDER_STYLE = Border(
+    left=Side(style='thin', color='000000'),
+    right=Side(style='thin', color='000000'),
+    top=Side(style='thin', color='000000'),
+    bottom=Side(style='thin', color='000000')
+)
+HEADER_FILL = PatternFill(start_color='D3D3D3', end_color='D3D3D3', fill_type='solid')
+GREY_FILL = PatternFill(start_color='E8E8E8', end_color='E8E8E8', fill_type='solid')
+HIGHLIGHT_FILL = PatternFill(start_color='FFFF00', end_color='FFFF00', fill_type='solid')  # Yellow
+CENTER_ALIGN = Alignment(horizontal='center', vertical='center')
+RIGHT_ALIGN = Alignment(horizontal='right', vertical='center')
+
+# Named styles registered on each output workbook: name -> (font, fill, border, alignment, number_format)
+CELL_STYLES = {
+    'title': (TITLE_FONT, None, None, None, None),
+    'je_title': (JE_TITLE_FONT, None, None, None, None),
+    'bold': (BOLD_FONT, None, None, None, None),
+    'italic': (ITALIC_FONT, None, None, None, None),
+    'section': (HEADER_FONT, None, None, None, None),
+    'section_boxed': (HEADER_FONT, HEADER_FILL, BORDER_STYLE, None, None),
+    'header': (HEADER_FONT, HEADER_FILL, BORDER_STYLE, CENTER_ALIGN, None),
+    'row': (NORMAL_FONT, None, BORDER_STYLE, None, None),
+    'row_money': (NORMAL_FONT, None, BORDER_STYLE, RIGHT_ALIGN, '#,##0.00'),
+    'row_date': (NORMAL_FONT, None, BORDER_STYLE, None, 'm/d/yyyy'),
+    'row_highlight': (NORMAL_FONT, HIGHLIGHT_FILL, BORDER_STYLE, None, None),
+    'row_money_highlight': (NORMAL_FONT, HIGHLIGHT_FILL, BORDER_STYLE, RIGHT_ALIGN, '#,##0.00'),
+    'total': (BOLD_FONT, GREY_FILL, BORDER_STYLE, None, None),
+    'total_money': (BOLD_FONT, GREY_FILL, BORDER_STYLE, RIGHT_ALIGN, '#,##0.00')
+}
+
+# JE accounts: [0] is debited when net > 0, [1] is credited (and vice versa)
+JE_ACCOUNTS = (
+    '22010 - Customer Funds Obligation : Customer Funds Liability',
+    '21017 - Other Current Liabilities : Accrued Liabilities - Platform'
+)
+
+MONTH_NAMES = ('', 'January', 'February', 'March', 'April', 'May', 'June',
+               'July', 'August', 'September', 'October', 'November', 'December')
+
+DETAIL_HEADERS = ('Date', 'ACH_DEBIT_AMOUNT', 'ACH_RETURN_AMOUNT', 'Date processed', 'CN', 'DN', 'Net Amount (B-C)')
+JE_HEADERS = ('Debit', 'Credit', 'Date', 'Reversal Date', 'Memo', 'Account',
+              'Department', 'Location', 'Name', 'Subsidiary', 'Journal Entry : Memo', 'Class')
+
+# Named style for each JE column: Debit/Credit amounts, Date/Reversal Date, then text
+JE_COLUMN_STYLES = ('row_money', 'row_money', 'row_date', 'row_date') + ('row',) * 8
+
+# Department, Location, Name (left empty) and Subsidiary on every JE line
+JE_COMMON = ('0000 Corporate', '1 San Francisco', None, 'Gusto Inc Global : Gusto Inc US')
+JE_CLASS = '601 Horizontal'
+
+# Column widths for the generated sheets (A-G hold the transaction detail table)
+COLUMN_WIDTHS = (
+    ('A', 12),  # Date
+    ('B', 20),  # ACH_DEBIT_AMOUNT
+    ('C', 20),  # ACH_RETURN_AMOUNT
+    ('D', 18),  # Date processed
+    ('E', 15),  # CN
+    ('F', 15),  # DN
+    ('G', 20),  # Net Amount (B-C)
+    ('H', 18),
+    ('I', 35),
+    ('J', 15),
+    ('K', 35),
+    ('L', 15)
+)
+
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def je_only_filename(output_filename):
+    """Name of the JE-only workbook generated alongside a summary workbook"""
+    return output_filename.replace('_Summary_JE.xlsx', '_JE_Only.xlsx')
+
+
 def extract_month_from_filename(filename):
     """Extract month name and year from filename"""
-    month_mapping = {
-        'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4,
-        'mayo': 5, 'junio': 6, 'julio': 7, 'agosto': 8,
-        'septiembre': 9, 'octubre': 10, 'noviembre': 11, 'diciembre': 12,
-        'january': 1, 'february': 2, 'march': 3, 'april': 4,
-        'may': 5, 'june': 6, 'july': 7, 'august': 8,
-        'september': 9, 'october': 10, 'november': 11, 'december': 12
-    }
-    
-    filename_lower = filename.lower()
-    for month_name, month_num in month_mapping.items():
-        if month_name in filename_lower:
-            year_match = re.search(r'20\d{2}', filename)
-            year = int(year_match.group()) if year_match else datetime.now().year
-            return month_num, year
+    month_num = year = None
+    for month_str, year_str in _PERIOD_RE.findall(filename):
+        if month_str:
+            month_num = month_num or _MONTH_MAP[month_str.lower()]
+        else:
+            year = year or int(year_str)
     
-    return None, None
+    if not month_num:
+        return None, None
+    return month_num, year or datetime.now().year
 
 
 def get_following_month(month, year):
@@ -60,22 +168,76 @@ def get_following_month(month, year):
 
 
 def parse_date(date_value):
-    """Parse date from various formats"""
+    """Parse date from m/d/yy, m/d/yyyy or yyyy-mm-dd strings"""
     if isinstance(date_value, datetime):
         return date_value
     if isinstance(date_value, str):
-        for fmt in ['%m/%d/%y', '%m/%d/%Y', '%Y-%m-%d']:
-            try:
-                return datetime.strptime(date_value, fmt)
-            except:
-                continue
+        return parse_date_string(date_value.strip())
     return None
 
 
-def process_transaction_file(filepath):
+@lru_cache(maxsize=4096)
+def parse_date_string(text):
+    """Parse one date string; exports repeat a few dates, so results are cached"""
+    match = _DATE_RE.match(text)
+    if not match:
+        return None
+    first, second, third = match.groups()
+    if len(first) == 4:
+        year, month, day = int(first), int(second), int(third)
+    else:
+        month, day, year = int(first), int(second), int(third)
+        if len(third) == 2:
+            # Same pivot as strptime's %y: 69-99 -> 19xx, 00-68 -> 20xx
+            year += 1900 if year >= 69 else 2000
+    try:
+        return datetime(year, month, day)
+    except ValueError:
+        return None
+
+
+def parse_amount(value):
+    """Parse an amount cell; blanks, '-' and unparseable text count as 0"""
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str) and value != '-':
+        try:
+            return float(value.replace(',', ''))
+        except ValueError:
+            pass
+    return 0
+
+
+def normalize_cell(value):
+    """Convert a calamine cell value to the type openpyxl would return"""
+    if value == '':
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if type(value) is date:
+        return datetime(value.year, value.month, value.day)
+    return value
+
+
+def read_sheet_rows(filepath):
+    """Iterate the rows of the first visible worksheet as lists of raw calamine values"""
+    with CalamineWorkbook.from_path(filepath) as wb:
+        # calamine does not expose the active sheet, so skip hidden sheets and chart sheets instead
+        sheet_name = next((sheet.name for sheet in wb.sheets_metadata
+                           if sheet.typ == SheetTypeEnum.WorkSheet and sheet.visible == SheetVisibleEnum.Visible),
+                          wb.sheet_names[0])
+        sheet = wb.get_sheet_by_name(sheet_name)
+    
+    # The sheet's cells are already loaded, so rows still stream after the file is closed;
+    # they are converted to Python lists one at a time instead of all up front
+    return sheet.iter_rows()
+
+
+def process_transaction_file(filepath, filename=None):
     """Process the transaction file and calculate pending debits"""
     
-    filename = Path(filepath).name
+    # The period is detected from the original upload name when one is given
+    filename = filename or Path(filepath).name
     file_month, file_year = extract_month_from_filename(filename)
     
     if not file_month:
@@ -83,100 +245,79 @@ def process_transaction_file(filepath):
     
     following_month, following_year = get_following_month(file_month, file_year)
     
-    # Load workbook
-    wb = openpyxl.load_workbook(filepath)
-    ws = wb.active
+    # Stream the sheet through calamine instead of walking openpyxl cells
+    rows = read_sheet_rows(filepath)
     
     # Find header row and column indices
     headers = {}
-    for row in ws.iter_rows(min_row=1, max_row=5, values_only=False):
-        for cell in row:
-            if cell.value:
-                header_text = str(cell.value).strip()
-                if 'Date processed' in header_text or 'Date Processed' in header_text:
-                    headers['date_processed'] = cell.column
-                elif 'ACH_DEBIT_AMOUNT' in header_text:
-                    headers['debit_amount'] = cell.column
-                elif 'ACH_RETURN_AMOUNT' in header_text:
-                    headers['return_amount'] = cell.column
-                elif header_text == 'Date':
-                    headers['date'] = cell.column
+    header_row = None
+    for row_idx, row in enumerate(islice(rows, 5), start=1):
+        for col_idx, value in enumerate(row, start=1):
+            if value:
+                key = HEADER_MAP.get(str(value).strip().lower())
+                if key:
+                    headers[key] = col_idx
         
-        if len(headers) >= 3:
-            header_row = cell.row
+        if 'date_processed' in headers and ('debit_amount' in headers or 'return_amount' in headers):
+            header_row = row_idx
             break
     
-    if 'date_processed' not in headers:
-        wb.close()
+    if header_row is None:
         return None, "Could not find 'Date processed' column"
     
-    # Find CN and DN columns
-    for row in ws.iter_rows(min_row=1, max_row=5, values_only=False):
-        for cell in row:
-            if cell.value:
-                header_text = str(cell.value).strip()
-                if header_text == 'CN':
-                    headers['cn'] = cell.column
-                elif header_text == 'DN':
-                    headers['dn'] = cell.column
-    
     # Process transactions
     total_debit = 0
     total_return = 0
-    filtered_transactions = []
+    transaction_count = 0
     all_transactions = []
     
-    for row in ws.iter_rows(min_row=header_row + 1, values_only=False):
-        date_processed_cell = row[headers['date_processed'] - 1]
-        date_processed = parse_date(date_processed_cell.value)
-        
-        if not date_processed_cell.value:
+    target_ym = (following_year, following_month)
+    
+    # Resolve 0-based column positions once instead of per row
+    date_processed_idx = headers['date_processed'] - 1
+    debit_idx = headers['debit_amount'] - 1 if 'debit_amount' in headers else None
+    return_idx = headers['return_amount'] - 1 if 'return_amount' in headers else None
+    date_idx = headers['date'] - 1 if 'date' in headers else None
+    cn_idx = headers['cn'] - 1 if 'cn' in headers else None
+    dn_idx = headers['dn'] - 1 if 'dn' in headers else None
+    
+    # The header scan stopped on the header row, so the iterator resumes at the first data row
+    for row in rows:
+        # Skip empty rows before any parsing work
+        if not row[date_processed_idx]:
             continue
         
-        debit_cell = row[headers['debit_amount'] - 1]
-        debit_value = debit_cell.value
-        debit_amount = 0
-        if debit_value and debit_value != '-':
-            try:
-                debit_amount = float(str(debit_value).replace(',', ''))
-            except:
-                pass
+        # Only the columns we use are converted to openpyxl-style values
+        date_processed_value = normalize_cell(row[date_processed_idx])
+        date_processed = parse_date(date_processed_value)
+        
+        debit_value = normalize_cell(row[debit_idx]) if debit_idx is not None else None
+        debit_amount = parse_amount(debit_value)
         
-        return_cell = row[headers['return_amount'] - 1]
-        return_value = return_cell.value
-        return_amount = 0
-        if return_value and return_value != '-':
-            try:
-                return_amount = float(str(return_value).replace(',', ''))
-            except:
-                pass
+        return_value = normalize_cell(row[return_idx]) if return_idx is not None else None
+        return_amount = parse_amount(return_value)
         
-        date_cell = row[headers.get('date', 0) - 1] if 'date' in headers else None
-        cn_cell = row[headers.get('cn', 0) - 1] if 'cn' in headers else None
-        dn_cell = row[headers.get('dn', 0) - 1] if 'dn' in headers else None
+        date_value = normalize_cell(row[date_idx]) if date_idx is not None else ''
+        cn_value = normalize_cell(row[cn_idx]) if cn_idx is not None else ''
+        dn_value = normalize_cell(row[dn_idx]) if dn_idx is not None else ''
         
-        is_following_month = date_processed and date_processed.month == following_month and date_processed.year == following_year
+        is_following_month = date_processed is not None and (date_processed.year, date_processed.month) == target_ym
         
-        all_transactions.append({
-            'date': date_cell.value if date_cell else '',
-            'date_processed': date_processed_cell.value,
-            'debit': debit_value if debit_value and debit_value != '-' else 0,
-            'return': return_value if return_value and return_value != '-' else 0,
-            'cn': cn_cell.value if cn_cell else '',
-            'dn': dn_cell.value if dn_cell else '',
-            'is_following_month': is_following_month
-        })
+        all_transactions.append(Txn(
+            date_value,
+            date_processed_value,
+            debit_amount or None,
+            return_amount or None,
+            cn_value,
+            dn_value,
+            is_following_month,
+            debit_amount - return_amount if is_following_month else None
+        ))
         
         if is_following_month:
             total_debit += debit_amount
             total_return += return_amount
-            
-            filtered_transactions.append({
-                'date': date_cell.value if date_cell else '',
-                'date_processed': date_processed_cell.value,
-                'debit': debit_value if debit_value and debit_value != '-' else 0,
-                'return': return_value if return_value and return_value != '-' else 0
-            })
+            transaction_count += 1
     
     net_amount = total_debit - total_return
     
@@ -188,296 +329,217 @@ def process_transaction_file(filepath):
         'total_debit': total_debit,
         'total_return': total_return,
         'net_amount': net_amount,
-        'transactions': filtered_transactions,
+        'transaction_count': transaction_count,
         'all_transactions': all_transactions,
         'filename': filename
     }
     
-    wb.close()
     return result, None
 
 
+def add_cell_styles(wb):
+    """Register CELL_STYLES on a new workbook so cells can be styled by name"""
+    # NamedStyles are bound to a single workbook, so build fresh ones every time
+    for name, (font, fill, border, alignment, number_format) in CELL_STYLES.items():
+        wb.add_named_style(NamedStyle(name=name, font=font, fill=fill, border=border or DEFAULT_BORDER,
+                                      alignment=alignment, number_format=number_format or 'General'))
+
+
+def styled_cell(ws, value, style):
+    """Build a write-only cell with one of the CELL_STYLES applied"""
+    # A named style copies one precomputed style array instead of hashing each attribute;
+    # the value is set afterwards so datetimes still pick up their date number format
+    cell = WriteOnlyCell(ws)
+    cell.style = style
+    cell.value = value
+    return cell
+
+
+def write_je_row(ws, values):
+    """Append one 12-column JE line, styling each column per JE_COLUMN_STYLES"""
+    ws.append([styled_cell(ws, value, style) for value, style in zip(values, JE_COLUMN_STYLES)])
+
+
+def set_column_widths(ws):
+    """Apply the A-L column widths shared by the summary and JE-only workbooks"""
+    for col, width in COLUMN_WIDTHS:
+        ws.column_dimensions[col].width = width
+
+
+def append_journal_entry(ws, result):
+    """Append the JE header row and the journal entry lines for result; return the rows added"""
+    ws.append([styled_cell(ws, header, 'header')
+               for header in JE_HEADERS])
+    
+    # Generate JE
+    net = result['net_amount']
+    file_month_str = f"{result['file_month']:02d}"
+    file_year_str = str(result['file_year'])
+    memo = f"dLocal Pending Debits {file_month_str}.{file_year_str}"
+    
+    last_day = monthrange(result['file_year'], result['file_month'])[1]
+    # Real dates rather than strings, shown as m/d/yyyy by the row_date style
+    je_date = date(result['file_year'], result['file_month'], last_day)
+    reversal_date = date(result['following_year'], result['following_month'], 1)
+    
+    if net != 0:
+        amount = abs(net)
+        if net > 0:
+            # Positive: Debit 22010, Credit 21017
+            je_lines = [(amount, None, JE_ACCOUNTS[0]), (None, amount, JE_ACCOUNTS[1])]
+        else:
+            # Negative: Credit 22010, Debit 21017
+            je_lines = [(None, amount, JE_ACCOUNTS[0]), (amount, None, JE_ACCOUNTS[1])]
+        
+        for debit, credit, account in je_lines:
+            write_je_row(ws, (debit, credit, je_date, reversal_date, memo, account,
+                              *JE_COMMON, memo, JE_CLASS))
+        return 1 + len(je_lines)
+    
+    else:
+        # Zero amount
+        ws.append([styled_cell(ws, 'No journal entry required (Net Amount = 0)', 'italic')])
+        return 2
+
+
 def create_summary_and_je(result, output_filepath):
     """Create summary table and journal entry in a new Excel file"""
     
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "dLocal Pending Summary"
-    
-    # Styles
-    header_font = Font(name='Calibri', size=11, bold=True, color='000000')
-    normal_font = Font(name='Calibri', size=11, color='000000')
-    border_style = Border(
-        left=Side(style='thin', color='000000'),
-        right=Side(style='thin', color='000000'),
-        top=Side(style='thin', color='000000'),
-        bottom=Side(style='thin', color='000000')
-    )
-    header_fill = PatternFill(start_color='D3D3D3', end_color='D3D3D3', fill_type='solid')
-    center_align = Alignment(horizontal='center', vertical='center')
-    right_align = Alignment(horizontal='right', vertical='center')
+    # Write-only workbooks stream rows to disk instead of keeping every cell in memory
+    wb = openpyxl.Workbook(write_only=True)
+    add_cell_styles(wb)
+    ws = wb.create_sheet("dLocal Pending Summary")
     
-    # Title
-    ws['A1'] = 'dLocal Pending Debits Processing'
-    ws['A1'].font = Font(name='Calibri', size=14, bold=True)
-    ws.merge_cells('A1:F1')
+    # Write-only sheets need column widths before the first append
+    set_column_widths(ws)
     
-    # File information
-    month_names = ['', 'January', 'February', 'March', 'April', 'May', 'June',
-                   'July', 'August', 'September', 'October', 'November', 'December']
+    # row is the number of the last appended row; bump it after every append
+    row = 0
     
-    ws['A3'] = f"File Period: {month_names[result['file_month']]} {result['file_year']}"
-    ws['A3'].font = Font(name='Calibri', size=11, bold=True)
+    # Title
+    ws.append([styled_cell(ws, 'dLocal Pending Debits Processing', 'title')])
+    row += 1
+    ws.append([])
+    row += 1
     
-    ws['A4'] = f"Date Processed Filter: {month_names[result['following_month']]} {result['following_year']}"
-    ws['A4'].font = Font(name='Calibri', size=11, bold=True)
+    # File information
+    ws.append([styled_cell(ws, f"File Period: {MONTH_NAMES[result['file_month']]} {result['file_year']}",
+                           'bold')])
+    row += 1
+    ws.append([styled_cell(ws, f"Date Processed Filter: {MONTH_NAMES[result['following_month']]} {result['following_year']}",
+                           'bold')])
+    row += 1
+    ws.append([])
+    row += 1
     
     # All Transactions Table
-    row = 6
-    ws[f'A{row}'] = 'ALL TRANSACTIONS'
-    ws[f'A{row}'].font = header_font
-    ws.merge_cells(f'A{row}:G{row}')
-    
+    ws.append([styled_cell(ws, 'ALL TRANSACTIONS', 'section')])
+    row += 1
+    ws.append([styled_cell(ws, header, 'header')
+               for header in DETAIL_HEADERS])
     row += 1
-    headers_detail = ['Date', 'ACH_DEBIT_AMOUNT', 'ACH_RETURN_AMOUNT', 'Date processed', 'CN', 'DN', 'Net Amount (B-C)']
-    for col_idx, header in enumerate(headers_detail, start=1):
-        cell = ws.cell(row=row, column=col_idx)
-        cell.value = header
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.border = border_style
-        cell.alignment = center_align
-    
-    # Highlight color for following month rows
-    highlight_fill = PatternFill(start_color='FFFF00', end_color='FFFF00', fill_type='solid')
     
     # Add ALL transaction rows
     for txn in result['all_transactions']:
-        row += 1
-        ws.cell(row=row, column=1).value = txn['date']
-        
-        debit_val = txn['debit'] if txn['debit'] != 0 else None
-        return_val = txn['return'] if txn['return'] != 0 else None
-        
-        ws.cell(row=row, column=2).value = debit_val
-        ws.cell(row=row, column=3).value = return_val
-        ws.cell(row=row, column=4).value = txn['date_processed']
-        ws.cell(row=row, column=5).value = txn.get('cn', '')
-        ws.cell(row=row, column=6).value = txn.get('dn', '')
-        
-        # Add formula for Net Amount
-        if txn.get('is_following_month', False):
-            formula = f'=IFERROR(B{row}-C{row},"")'
-            ws.cell(row=row, column=7).value = formula
+        if txn.is_following_month:
+            style, money_style = 'row_highlight', 'row_money_highlight'
         else:
-            ws.cell(row=row, column=7).value = ''
+            style, money_style = 'row', 'row_money'
         
-        for col_idx in range(1, 8):
-            cell = ws.cell(row=row, column=col_idx)
-            cell.font = normal_font
-            cell.border = border_style
-            
-            if txn.get('is_following_month', False):
-                cell.fill = highlight_fill
-            
-            if col_idx in [2, 3] and cell.value is not None:
-                cell.number_format = '#,##0.00'
-                cell.alignment = right_align
-            elif col_idx == 7:
-                cell.number_format = '#,##0.00'
-                cell.alignment = right_align
+        ws.append([
+            styled_cell(ws, txn.date, style),
+            styled_cell(ws, txn.debit, money_style),
+            styled_cell(ws, txn.return_, money_style),
+            styled_cell(ws, txn.date_processed, style),
+            styled_cell(ws, txn.cn, style),
+            styled_cell(ws, txn.dn, style),
+            styled_cell(ws, txn.net if txn.is_following_month else '', money_style)
+        ])
+        row += 1
     
     # Summary Table
-    row += 2
-    ws[f'A{row}'] = 'SUMMARY'
-    ws[f'A{row}'].font = header_font
-    ws[f'A{row}'].fill = header_fill
-    ws[f'A{row}'].border = border_style
-    ws.merge_cells(f'A{row}:B{row}')
+    ws.append([])
+    row += 1
+    ws.append([styled_cell(ws, 'SUMMARY', 'section_boxed')])
+    row += 1
+    # Plain titles simply overflow into the empty cells to their right; only this
+    # filled, boxed heading needs a merge
+    ws.merged_cells.add(f'A{row}:B{row}')
     
+    ws.append([styled_cell(ws, header, 'header')
+               for header in ('Description', 'Amount')])
     row += 1
-    ws[f'A{row}'] = 'Description'
-    ws[f'B{row}'] = 'Amount'
-    for col in ['A', 'B']:
-        ws[f'{col}{row}'].font = header_font
-        ws[f'{col}{row}'].fill = header_fill
-        ws[f'{col}{row}'].border = border_style
-        ws[f'{col}{row}'].alignment = center_align
     
+    ws.append([
+        styled_cell(ws, 'Total ACH Debit Amount', 'row'),
+        styled_cell(ws, result['total_debit'], 'row_money')
+    ])
     row += 1
-    ws[f'A{row}'] = 'Total ACH Debit Amount'
-    ws[f'B{row}'] = result['total_debit']
-    ws[f'A{row}'].font = normal_font
-    ws[f'A{row}'].border = border_style
-    ws[f'B{row}'].font = normal_font
-    ws[f'B{row}'].border = border_style
-    ws[f'B{row}'].number_format = '#,##0.00'
-    ws[f'B{row}'].alignment = right_align
     
+    ws.append([
+        styled_cell(ws, 'Total ACH Return Amount', 'row'),
+        styled_cell(ws, result['total_return'], 'row_money')
+    ])
     row += 1
-    ws[f'A{row}'] = 'Total ACH Return Amount'
-    ws[f'B{row}'] = result['total_return']
-    ws[f'A{row}'].font = normal_font
-    ws[f'A{row}'].border = border_style
-    ws[f'B{row}'].font = normal_font
-    ws[f'B{row}'].border = border_style
-    ws[f'B{row}'].number_format = '#,##0.00'
-    ws[f'B{row}'].alignment = right_align
     
+    ws.append([
+        styled_cell(ws, 'Net Amount (Debit - Return)', 'total'),
+        styled_cell(ws, result['net_amount'], 'total_money')
+    ])
     row += 1
-    ws[f'A{row}'] = 'Net Amount (Debit - Return)'
-    ws[f'B{row}'] = result['net_amount']
-    ws[f'A{row}'].font = Font(name='Calibri', size=11, bold=True)
-    ws[f'A{row}'].border = border_style
-    ws[f'A{row}'].fill = PatternFill(start_color='E8E8E8', end_color='E8E8E8', fill_type='solid')
-    ws[f'B{row}'].font = Font(name='Calibri', size=11, bold=True)
-    ws[f'B{row}'].border = border_style
-    ws[f'B{row}'].number_format = '#,##0.00'
-    ws[f'B{row}'].alignment = right_align
-    ws[f'B{row}'].fill = PatternFill(start_color='E8E8E8', end_color='E8E8E8', fill_type='solid')
     
     # Journal Entry
-    row += 3
-    ws[f'A{row}'] = 'JOURNAL ENTRY'
-    ws[f'A{row}'].font = Font(name='Calibri', size=12, bold=True)
-    ws.merge_cells(f'A{row}:L{row}')
-    
+    ws.append([])
+    row += 1
+    ws.append([])
+    row += 1
+    ws.append([styled_cell(ws, 'JOURNAL ENTRY', 'je_title')])
     row += 1
-    je_headers = ['Debit', 'Credit', 'Date', 'Reversal Date', 'Memo', 'Account', 
-                  'Department', 'Location', 'Name', 'Subsidiary', 'Journal Entry : Memo', 'Class']
-    for col_idx, header in enumerate(je_headers, start=1):
-        cell = ws.cell(row=row, column=col_idx)
-        cell.value = header
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.border = border_style
-        cell.alignment = center_align
-    
-    # Generate JE
-    net = result['net_amount']
-    file_month_str = f"{result['file_month']:02d}"
-    file_year_str = str(result['file_year'])
-    memo = f"dLocal Pending Debits {file_month_str}.{file_year_str}"
     
-    last_day = monthrange(result['file_year'], result['file_month'])[1]
-    date_str = f"{result['file_month']}/{last_day}/{result['file_year']}"
-    reversal_date_str = f"{result['following_month']}/1/{result['following_year']}"
+    row += append_journal_entry(ws, result)
     
-    if net > 0:
-        # Positive: Debit 22010, Credit 21017
-        row += 1
-        ws.cell(row=row, column=1).value = abs(net)
-        ws.cell(row=row, column=2).value = None
-        ws.cell(row=row, column=3).value = date_str
-        ws.cell(row=row, column=4).value = reversal_date_str
-        ws.cell(row=row, column=5).value = memo
-        ws.cell(row=row, column=6).value = '22010 - Customer Funds Obligation : Customer Funds Liability'
-        ws.cell(row=row, column=7).value = '0000 Corporate'
-        ws.cell(row=row, column=8).value = '1 San Francisco'
-        ws.cell(row=row, column=9).value = None
-        ws.cell(row=row, column=10).value = 'Gusto Inc Global : Gusto Inc US'
-        ws.cell(row=row, column=11).value = memo
-        ws.cell(row=row, column=12).value = '601 Horizontal'
-        
-        for col_idx in range(1, 13):
-            cell = ws.cell(row=row, column=col_idx)
-            cell.font = normal_font
-            cell.border = border_style
-            if col_idx in [1, 2]:
-                cell.number_format = '#,##0.00'
-                cell.alignment = right_align
-        
-        row += 1
-        ws.cell(row=row, column=1).value = None
-        ws.cell(row=row, column=2).value = abs(net)
-        ws.cell(row=row, column=3).value = date_str
-        ws.cell(row=row, column=4).value = reversal_date_str
-        ws.cell(row=row, column=5).value = memo
-        ws.cell(row=row, column=6).value = '21017 - Other Current Liabilities : Accrued Liabilities - Platform'
-        ws.cell(row=row, column=7).value = '0000 Corporate'
-        ws.cell(row=row, column=8).value = '1 San Francisco'
-        ws.cell(row=row, column=9).value = None
-        ws.cell(row=row, column=10).value = 'Gusto Inc Global : Gusto Inc US'
-        ws.cell(row=row, column=11).value = memo
-        ws.cell(row=row, column=12).value = '601 Horizontal'
-        
-        for col_idx in range(1, 13):
-            cell = ws.cell(row=row, column=col_idx)
-            cell.font = normal_font
-            cell.border = border_style
-            if col_idx in [1, 2]:
-                cell.number_format = '#,##0.00'
-                cell.alignment = right_align
-    
-    elif net < 0:
-        # Negative: Credit 22010, Debit 21017
-        row += 1
-        ws.cell(row=row, column=1).value = None
-        ws.cell(row=row, column=2).value = abs(net)
-        ws.cell(row=row, column=3).value = date_str
-        ws.cell(row=row, column=4).value = reversal_date_str
-        ws.cell(row=row, column=5).value = memo
-        ws.cell(row=row, column=6).value = '22010 - Customer Funds Obligation : Customer Funds Liability'
-        ws.cell(row=row, column=7).value = '0000 Corporate'
-        ws.cell(row=row, column=8).value = '1 San Francisco'
-        ws.cell(row=row, column=9).value = None
-        ws.cell(row=row, column=10).value = 'Gusto Inc Global : Gusto Inc US'
-        ws.cell(row=row, column=11).value = memo
-        ws.cell(row=row, column=12).value = '601 Horizontal'
-        
-        for col_idx in range(1, 13):
-            cell = ws.cell(row=row, column=col_idx)
-            cell.font = normal_font
-            cell.border = border_style
-            if col_idx in [1, 2]:
-                cell.number_format = '#,##0.00'
-                cell.alignment = right_align
-        
-        row += 1
-        ws.cell(row=row, column=1).value = abs(net)
-        ws.cell(row=row, column=2).value = None
-        ws.cell(row=row, column=3).value = date_str
-        ws.cell(row=row, column=4).value = reversal_date_str
-        ws.cell(row=row, column=5).value = memo
-        ws.cell(row=row, column=6).value = '21017 - Other Current Liabilities : Accrued Liabilities - Platform'
-        ws.cell(row=row, column=7).value = '0000 Corporate'
-        ws.cell(row=row, column=8).value = '1 San Francisco'
-        ws.cell(row=row, column=9).value = None
-        ws.cell(row=row, column=10).value = 'Gusto Inc Global : Gusto Inc US'
-        ws.cell(row=row, column=11).value = memo
-        ws.cell(row=row, column=12).value = '601 Horizontal'
-        
-        for col_idx in range(1, 13):
-            cell = ws.cell(row=row, column=col_idx)
-            cell.font = normal_font
-            cell.border = border_style
-            if col_idx in [1, 2]:
-                cell.number_format = '#,##0.00'
-                cell.alignment = right_align
+    wb.save(output_filepath)
+    wb.close()
+
+
+def create_je_only(result, output_filepath):
+    """Create the JE-only workbook (header and journal entry lines) in a new Excel file"""
     
-    else:
-        row += 1
-        ws[f'A{row}'] = 'No journal entry required (Net Amount = 0)'
-        ws[f'A{row}'].font = Font(name='Calibri', size=11, italic=True)
-    
-    # Adjust column widths
-    ws.column_dimensions['A'].width = 12
-    ws.column_dimensions['B'].width = 20
-    ws.column_dimensions['C'].width = 20
-    ws.column_dimensions['D'].width = 18
-    ws.column_dimensions['E'].width = 15
-    ws.column_dimensions['F'].width = 15
-    ws.column_dimensions['G'].width = 20
-    ws.column_dimensions['H'].width = 18
-    ws.column_dimensions['I'].width = 35
-    ws.column_dimensions['J'].width = 15
-    ws.column_dimensions['K'].width = 35
-    ws.column_dimensions['L'].width = 15
+    wb = openpyxl.Workbook(write_only=True)
+    add_cell_styles(wb)
+    ws = wb.create_sheet("Bank Fees Accrual JE Output")
+    set_column_widths(ws)
+    append_journal_entry(ws, result)
     
     wb.save(output_filepath)
     wb.close()
 
 
+def submit_output(writer, result, output_filename):
+    """Write one output workbook in the background; downloads wait on its future"""
+    output_filepath = os.path.join(app.config['OUTPUT_FOLDER'], output_filename)
+    future = _EXECUTOR.submit(writer, result, output_filepath)
+    _PENDING_OUTPUTS[output_filename] = future
+    future.add_done_callback(lambda done: output_written(done, output_filename))
+
+
+def output_written(future, output_filename):
+    """Forget a finished write, but keep and log a failed one for the download routes"""
+    error = future.exception()
+    if error is None:
+        # Only drop the entry if a newer write for the same name has not replaced it
+        if _PENDING_OUTPUTS.get(output_filename) is future:
+            _PENDING_OUTPUTS.pop(output_filename, None)
+    else:
+        app.logger.error('Failed to write %s', output_filename, exc_info=error)
+
+
+def wait_for_output(filename):
+    """Block until a background write for this output has finished; return its error, if any"""
+    future = _PENDING_OUTPUTS.get(filename)
+    return future.exception() if future else None
+
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -497,30 +559,31 @@ def upload_file():
     
     if file and allowed_file(file.filename):
         filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        unique_filename = f"{timestamp}_{filename}"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-        file.save(filepath)
+        # Microseconds keep output names unique for repeat uploads within the same second
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        
+        # Stream the upload into a temp file that only lives while it is processed
+        with tempfile.NamedTemporaryFile(suffix=os.path.splitext(filename)[1], delete=False) as tmp:
+            file.save(tmp)
+            filepath = tmp.name
         
-        # Process the file
-        result, error = process_transaction_file(filepath)
+        try:
+            # Process the file; the period comes from the uploaded name, not the temp path
+            result, error = process_transaction_file(filepath, filename)
+        finally:
+            os.unlink(filepath)
         
         if error:
             flash(f'Error processing file: {error}', 'error')
-            os.remove(filepath)
             return redirect(url_for('index'))
         
         # Generate output file
-        output_filename = f"{timestamp}_{filename.replace('.xlsx', '_Summary_JE.xlsx')}"
-        output_filepath = os.path.join(app.config['OUTPUT_FOLDER'], output_filename)
+        # Built from the stem so .xls uploads also get a distinct .xlsx summary name
+        output_filename = f"{timestamp}_{Path(filename).stem}_Summary_JE.xlsx"
         
-        create_summary_and_je(result, output_filepath)
-        
-        # Clean up uploaded file
-        os.remove(filepath)
-        
-        month_names = ['', 'January', 'February', 'March', 'April', 'May', 'June',
-                       'July', 'August', 'September', 'October', 'November', 'December']
+        # Each workbook gets its own future, so one failing never blocks the other's download
+        submit_output(create_summary_and_je, result, output_filename)
+        submit_output(create_je_only, result, je_only_filename(output_filename))
         
         # Calculate last day of file month
         last_day = monthrange(result['file_year'], result['file_month'])[1]
@@ -535,7 +598,7 @@ def upload_file():
                              total_debit=result['total_debit'],
                              total_return=result['total_return'],
                              net_amount=result['net_amount'],
-                             transaction_count=len(result['transactions']),
+                             transaction_count=result['transaction_count'],
                              all_transactions=result['all_transactions'],
                              last_day=last_day)
     else:
@@ -545,76 +608,25 @@ def upload_file():
 
 @app.route('/download/<filename>')
 def download_file(filename):
+    error = wait_for_output(filename)
+    if error:
+        flash(f'Error generating output file: {error}', 'error')
+        return redirect(url_for('index'))
+    
     filepath = os.path.join(app.config['OUTPUT_FOLDER'], filename)
     return send_file(filepath, as_attachment=True)
 
 
 @app.route('/download-je/<filename>')
 def download_je_only(filename):
-    """Generate and download JE template only (without transaction details)"""
-    full_filepath = os.path.join(app.config['OUTPUT_FOLDER'], filename)
-    
-    # Load the full workbook
-    wb_full = openpyxl.load_workbook(full_filepath)
-    ws_full = wb_full.active
-    
-    # Create new workbook for JE only
-    wb_je = openpyxl.Workbook()
-    ws_je = wb_je.active
-    ws_je.title = "Bank Fees Accrual JE Output"
-    
-    # Find where the JE section starts in the full workbook
-    je_start_row = None
-    for row in ws_full.iter_rows(min_row=1, values_only=False):
-        if row[0].value and 'JOURNAL ENTRY' in str(row[0].value):
-            je_start_row = row[0].row + 1  # Start from header row
-            break
-    
-    if je_start_row:
-        # Copy JE header and data rows
-        current_je_row = 1
-        for row_idx in range(je_start_row, ws_full.max_row + 1):
-            row = ws_full[row_idx]
-            # Stop if we hit an empty row after JE data
-            if all(cell.value is None for cell in row[:12]):
-                break
-            
-            # Copy cell values and formatting
-            for col_idx in range(1, 13):  # Columns A-L
-                source_cell = ws_full.cell(row=row_idx, column=col_idx)
-                target_cell = ws_je.cell(row=current_je_row, column=col_idx)
-                
-                # Copy value
-                target_cell.value = source_cell.value
-                
-                # Copy formatting
-                if source_cell.font:
-                    target_cell.font = source_cell.font.copy()
-                if source_cell.border:
-                    target_cell.border = source_cell.border.copy()
-                if source_cell.fill:
-                    target_cell.fill = source_cell.fill.copy()
-                if source_cell.number_format:
-                    target_cell.number_format = source_cell.number_format
-                if source_cell.alignment:
-                    target_cell.alignment = source_cell.alignment.copy()
-            
-            current_je_row += 1
-        
-        # Copy column widths
-        for col_idx in range(1, 13):
-            col_letter = openpyxl.utils.get_column_letter(col_idx)
-            if col_letter in ws_full.column_dimensions:
-                ws_je.column_dimensions[col_letter].width = ws_full.column_dimensions[col_letter].width
-    
-    wb_full.close()
+    """Download the JE template only (without transaction details)"""
+    je_filename = je_only_filename(filename)
+    error = wait_for_output(je_filename)
+    if error:
+        flash(f'Error generating output file: {error}', 'error')
+        return redirect(url_for('index'))
     
-    # Save JE-only workbook
-    je_filename = filename.replace('_Summary_JE.xlsx', '_JE_Only.xlsx')
     je_filepath = os.path.join(app.config['OUTPUT_FOLDER'], je_filename)
-    wb_je.save(je_filepath)
-    wb_je.close()
-    
     return send_file(je_filepath, as_attachment=True)
 
 
@@ -5,33 +5,132 @@ Reads transaction file, filters by following month, and generates journal entrie
 """
 
 import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from datetime import datetime
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, NamedStyle
+from openpyxl.styles.borders import DEFAULT_BORDER
+from python_calamine import CalamineWorkbook, SheetTypeEnum, SheetVisibleEnum
+from datetime import date, datetime
 import re
+from functools import lru_cache
 import sys
 from pathlib import Path
+from collections import namedtuple
+from itertools import islice
+from calendar import monthrange
+
+
+# Normalized header text -> internal column key
+HEADER_MAP = {
+    'date processed': 'date_processed',
+    'ach_debit_amount': 'debit_amount',
+    'ach_return_amount': 'return_amount',
+    'date': 'date',
+    'cn': 'cn',
+    'dn': 'dn'
+}
+
+# Spanish and English month names -> month number
+_MONTH_MAP = {
+    'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4,
+    'mayo': 5, 'junio': 6, 'julio': 7, 'agosto': 8,
+    'septiembre': 9, 'octubre': 10, 'noviembre': 11, 'diciembre': 12,
+    'january': 1, 'february': 2, 'march': 3, 'april': 4,
+    'may': 5, 'june': 6, 'july': 7, 'august': 8,
+    'september': 9, 'october': 10, 'november': 11, 'december': 12
+}
+# Month name or year in one alternation, so a single scan of the filename finds both
+_PERIOD_RE = re.compile('(' + '|'.join(_MONTH_MAP) + r')|(20\d{2})', re.IGNORECASE)
+_DATE_RE = re.compile(r'^(\d{1,4})[-/](\d{1,2})[-/](\d{1,4})$')
+
+# One input row; 'return_' avoids the Python keyword, and debit/return_ are parsed amounts or None
+Txn = namedtuple('Txn', 'date date_processed debit return_ cn dn is_following_month net')
+
+# Cell styles shared by every generated workbook
+HEADER_FONT = Font(name='Calibri', size=11, bold=True, color='000000')
+NORMAL_FONT = Font(name='Calibri', size=11, color='000000')
+BOLD_FONT = Font(name='Calibri', size=11, bold=True)
+ITALIC_FONT = Font(name='Calibri', size=11, italic=True)
+TITLE_FONT = Font(name='Calibri', size=14, bold=True)
+JE_TITLE_FONT = Font(name='Calibri', size=12, bold=True)
+BORDER_STYLE = Border(
+    left=Side(style='thin', color='000000'),
+    right=Side(style='thin', color='000000'),
+    top=Side(style='thin', color='000000'),
+    bottom=Side(style='thin', color='000000')
+)
+HEADER_FILL = PatternFill(start_color='D3D3D3', end_color='D3D3D3', fill_type='solid')
+GREY_FILL = PatternFill(start_color='E8E8E8', end_color='E8E8E8', fill_type='solid')
+HIGHLIGHT_FILL = PatternFill(start_color='FFFF00', end_color='FFFF00', fill_type='solid')  # Yellow
+CENTER_ALIGN = Alignment(horizontal='center', vertical='center')
+RIGHT_ALIGN = Alignment(horizontal='right', vertical='center')
+
+# Named styles registered on each output workbook: name -> (font, fill, border, alignment, number_format)
+CELL_STYLES = {
+    'title': (TITLE_FONT, None, None, None, None),
+    'je_title': (JE_TITLE_FONT, None, None, None, None),
+    'bold': (BOLD_FONT, None, None, None, None),
+    'italic': (ITALIC_FONT, None, None, None, None),
+    'section': (HEADER_FONT, None, None, None, None),
+    'section_boxed': (HEADER_FONT, HEADER_FILL, BORDER_STYLE, None, None),
+    'header': (HEADER_FONT, HEADER_FILL, BORDER_STYLE, CENTER_ALIGN, None),
+    'row': (NORMAL_FONT, None, BORDER_STYLE, None, None),
+    'row_money': (NORMAL_FONT, None, BORDER_STYLE, RIGHT_ALIGN, '#,##0.00'),
+    'row_date': (NORMAL_FONT, None, BORDER_STYLE, None, 'm/d/yyyy'),
+    'row_highlight': (NORMAL_FONT, HIGHLIGHT_FILL, BORDER_STYLE, None, None),
+    'row_money_highlight': (NORMAL_FONT, HIGHLIGHT_FILL, BORDER_STYLE, RIGHT_ALIGN, '#,##0.00'),
+    'total': (BOLD_FONT, GREY_FILL, BORDER_STYLE, None, None),
+    'total_money': (BOLD_FONT, GREY_FILL, BORDER_STYLE, RIGHT_ALIGN, '#,##0.00')
+}
+
+# JE accounts: [0] is debited when net > 0, [1] is credited (and vice versa)
+JE_ACCOUNTS = (
+    '22010 - Customer Funds Obligation : Customer Funds Liability',
+    '21017 - Other Current Liabilities : Accrued Liabilities - Platform'
+)
+
+MONTH_NAMES = ('', 'January', 'February', 'March', 'April', 'May', 'June',
+               'July', 'August', 'September', 'October', 'November', 'December')
+
+DETAIL_HEADERS = ('Date', 'ACH_DEBIT_AMOUNT', 'ACH_RETURN_AMOUNT', 'Date processed', 'CN', 'DN', 'Net Amount (B-C)')
+JE_HEADERS = ('Debit', 'Credit', 'Date', 'Reversal Date', 'Memo', 'Account',
+              'Department', 'Location', 'Name', 'Subsidiary', 'Journal Entry : Memo', 'Class')
+
+# Named style for each JE column: Debit/Credit amounts, Date/Reversal Date, then text
+JE_COLUMN_STYLES = ('row_money', 'row_money', 'row_date', 'row_date') + ('row',) * 8
+
+# Department, Location, Name (left empty) and Subsidiary on every JE line
+JE_COMMON = ('0000 Corporate', '1 San Francisco', None, 'Gusto Inc Global : Gusto Inc US')
+JE_CLASS = '601 Horizontal'
+
+# Column widths for the generated sheets (A-G hold the transaction detail table)
+COLUMN_WIDTHS = (
+    ('A', 12),  # Date
+    ('B', 20),  # ACH_DEBIT_AMOUNT
+    ('C', 20),  # ACH_RETURN_AMOUNT
+    ('D', 18),  # Date processed
+    ('E', 15),  # CN
+    ('F', 15),  # DN
+    ('G', 20),  # Net Amount (B-C)
+    ('H', 18),
+    ('I', 35),
+    ('J', 15),
+    ('K', 35),
+    ('L', 15)
+)
 
 
 def extract_month_from_filename(filename):
     """Extract month name and year from filename like '09 Control Gusto Inc Septiembre 2025.xlsx'"""
-    month_mapping = {
-        'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4,
-        'mayo': 5, 'junio': 6, 'julio': 7, 'agosto': 8,
-        'septiembre': 9, 'octubre': 10, 'noviembre': 11, 'diciembre': 12,
-        'january': 1, 'february': 2, 'march': 3, 'april': 4,
-        'may': 5, 'june': 6, 'july': 7, 'august': 8,
-        'september': 9, 'october': 10, 'november': 11, 'december': 12
-    }
-    
-    filename_lower = filename.lower()
-    for month_name, month_num in month_mapping.items():
-        if month_name in filename_lower:
-            # Extract year
-            year_match = re.search(r'20\d{2}', filename)
-            year = int(year_match.group()) if year_match else datetime.now().year
-            return month_num, year
+    month_num = year = None
+    for month_str, year_str in _PERIOD_RE.findall(filename):
+        if month_str:
+            month_num = month_num or _MONTH_MAP[month_str.lower()]
+        else:
+            year = year or int(year_str)
     
-    return None, None
+    if not month_num:
+        return None, None
+    return month_num, year or datetime.now().year
 
 
 def get_following_month(month, year):
@@ -42,19 +141,71 @@ def get_following_month(month, year):
 
 
 def parse_date(date_value):
-    """Parse date from various formats"""
+    """Parse date from m/d/yy, m/d/yyyy or yyyy-mm-dd strings"""
     if isinstance(date_value, datetime):
         return date_value
     if isinstance(date_value, str):
-        # Try different date formats
-        for fmt in ['%m/%d/%y', '%m/%d/%Y', '%Y-%m-%d']:
-            try:
-                return datetime.strptime(date_value, fmt)
-            except:
-                continue
+        return parse_date_string(date_value.strip())
     return None
 
 
+@lru_cache(maxsize=4096)
+def parse_date_string(text):
+    """Parse one date string; exports repeat a few dates, so results are cached"""
+    match = _DATE_RE.match(text)
+    if not match:
+        return None
+    first, second, third = match.groups()
+    if len(first) == 4:
+        year, month, day = int(first), int(second), int(third)
+    else:
+        month, day, year = int(first), int(second), int(third)
+        if len(third) == 2:
+            # Same pivot as strptime's %y: 69-99 -> 19xx, 00-68 -> 20xx
+            year += 1900 if year >= 69 else 2000
+    try:
+        return datetime(year, month, day)
+    except ValueError:
+        return None
+
+
+def parse_amount(value):
+    """Parse an amount cell; blanks, '-' and unparseable text count as 0"""
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str) and value != '-':
+        try:
+            return float(value.replace(',', ''))
+        except ValueError:
+            pass
+    return 0
+
+
+def normalize_cell(value):
+    """Convert a calamine cell value to the type openpyxl would return"""
+    if value == '':
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if type(value) is date:
+        return datetime(value.year, value.month, value.day)
+    return value
+
+
+def read_sheet_rows(filepath):
+    """Iterate the rows of the first visible worksheet as lists of raw calamine values"""
+    with CalamineWorkbook.from_path(filepath) as wb:
+        # calamine does not expose the active sheet, so skip hidden sheets and chart sheets instead
+        sheet_name = next((sheet.name for sheet in wb.sheets_metadata
+                           if sheet.typ == SheetTypeEnum.WorkSheet and sheet.visible == SheetVisibleEnum.Visible),
+                          wb.sheet_names[0])
+        sheet = wb.get_sheet_by_name(sheet_name)
+    
+    # The sheet's cells are already loaded, so rows still stream after the file is closed;
+    # they are converted to Python lists one at a time instead of all up front
+    return sheet.iter_rows()
+
+
 def process_transaction_file(filepath):
     """Process the transaction file and calculate pending debits"""
     
@@ -71,107 +222,86 @@ def process_transaction_file(filepath):
     print(f"Processing file for: {file_month}/{file_year}")
     print(f"Filtering for Date Processed in: {following_month}/{following_year}")
     
-    # Load workbook
-    wb = openpyxl.load_workbook(filepath)
-    ws = wb.active
+    # Stream the sheet through calamine instead of walking openpyxl cells
+    rows = read_sheet_rows(filepath)
     
     # Find header row and column indices
     headers = {}
-    for row in ws.iter_rows(min_row=1, max_row=5, values_only=False):
-        for cell in row:
-            if cell.value:
-                header_text = str(cell.value).strip()
-                if 'Date processed' in header_text or 'Date Processed' in header_text:
-                    headers['date_processed'] = cell.column
-                elif 'ACH_DEBIT_AMOUNT' in header_text:
-                    headers['debit_amount'] = cell.column
-                elif 'ACH_RETURN_AMOUNT' in header_text:
-                    headers['return_amount'] = cell.column
-                elif header_text == 'Date':
-                    headers['date'] = cell.column
+    header_row = None
+    for row_idx, row in enumerate(islice(rows, 5), start=1):
+        for col_idx, value in enumerate(row, start=1):
+            if value:
+                key = HEADER_MAP.get(str(value).strip().lower())
+                if key:
+                    headers[key] = col_idx
         
-        if len(headers) >= 3:
-            header_row = cell.row
+        if 'date_processed' in headers and ('debit_amount' in headers or 'return_amount' in headers):
+            header_row = row_idx
             break
     
-    if 'date_processed' not in headers:
+    if header_row is None:
         print("Error: Could not find 'Date processed' column")
         return None
     
-    # Find CN and DN columns
-    for row in ws.iter_rows(min_row=1, max_row=5, values_only=False):
-        for cell in row:
-            if cell.value:
-                header_text = str(cell.value).strip()
-                if header_text == 'CN':
-                    headers['cn'] = cell.column
-                elif header_text == 'DN':
-                    headers['dn'] = cell.column
-    
     # Process transactions
     total_debit = 0
     total_return = 0
-    filtered_transactions = []
+    transaction_count = 0
     all_transactions = []
     
-    for row in ws.iter_rows(min_row=header_row + 1, values_only=False):
-        date_processed_cell = row[headers['date_processed'] - 1]
-        date_processed = parse_date(date_processed_cell.value)
-        
-        # Skip empty rows
-        if not date_processed_cell.value:
+    target_ym = (following_year, following_month)
+    
+    # Resolve 0-based column positions once instead of per row
+    date_processed_idx = headers['date_processed'] - 1
+    debit_idx = headers['debit_amount'] - 1 if 'debit_amount' in headers else None
+    return_idx = headers['return_amount'] - 1 if 'return_amount' in headers else None
+    date_idx = headers['date'] - 1 if 'date' in headers else None
+    cn_idx = headers['cn'] - 1 if 'cn' in headers else None
+    dn_idx = headers['dn'] - 1 if 'dn' in headers else None
+    
+    # The header scan stopped on the header row, so the iterator resumes at the first data row
+    for row in rows:
+        # Skip empty rows before any parsing work
+        if not row[date_processed_idx]:
             continue
         
+        # Only the columns we use are converted to openpyxl-style values
+        date_processed_value = normalize_cell(row[date_processed_idx])
+        date_processed = parse_date(date_processed_value)
+        
         # Get debit amount
-        debit_cell = row[headers['debit_amount'] - 1]
-        debit_value = debit_cell.value
-        debit_amount = 0
-        if debit_value and debit_value != '-':
-            try:
-                debit_amount = float(str(debit_value).replace(',', ''))
-            except:
-                pass
+        debit_value = normalize_cell(row[debit_idx]) if debit_idx is not None else None
+        debit_amount = parse_amount(debit_value)
         
         # Get return amount
-        return_cell = row[headers['return_amount'] - 1]
-        return_value = return_cell.value
-        return_amount = 0
-        if return_value and return_value != '-':
-            try:
-                return_amount = float(str(return_value).replace(',', ''))
-            except:
-                pass
+        return_value = normalize_cell(row[return_idx]) if return_idx is not None else None
+        return_amount = parse_amount(return_value)
         
         # Get other fields
-        date_cell = row[headers.get('date', 0) - 1] if 'date' in headers else None
-        cn_cell = row[headers.get('cn', 0) - 1] if 'cn' in headers else None
-        dn_cell = row[headers.get('dn', 0) - 1] if 'dn' in headers else None
+        date_value = normalize_cell(row[date_idx]) if date_idx is not None else ''
+        cn_value = normalize_cell(row[cn_idx]) if cn_idx is not None else ''
+        dn_value = normalize_cell(row[dn_idx]) if dn_idx is not None else ''
         
         # Check if this transaction is in the following month
-        is_following_month = date_processed and date_processed.month == following_month and date_processed.year == following_year
+        is_following_month = date_processed is not None and (date_processed.year, date_processed.month) == target_ym
         
         # Store ALL transactions
-        all_transactions.append({
-            'date': date_cell.value if date_cell else '',
-            'date_processed': date_processed_cell.value,
-            'debit': debit_value if debit_value and debit_value != '-' else 0,
-            'return': return_value if return_value and return_value != '-' else 0,
-            'cn': cn_cell.value if cn_cell else '',
-            'dn': dn_cell.value if dn_cell else '',
-            'is_following_month': is_following_month
-        })
+        all_transactions.append(Txn(
+            date_value,
+            date_processed_value,
+            debit_amount or None,
+            return_amount or None,
+            cn_value,
+            dn_value,
+            is_following_month,
+            debit_amount - return_amount if is_following_month else None
+        ))
         
         # Check if this transaction should be included in the calculation
         if is_following_month:
             total_debit += debit_amount
             total_return += return_amount
-            
-            filtered_transactions.append({
-                'date': date_cell.value if date_cell else '',
-                'date_processed': date_processed_cell.value,
-                'debit': debit_value if debit_value and debit_value != '-' else 0,
-                'return': return_value if return_value and return_value != '-' else 0
-            })
+            transaction_count += 1
     
     net_amount = total_debit - total_return
     
@@ -183,312 +313,172 @@ def process_transaction_file(filepath):
         'total_debit': total_debit,
         'total_return': total_return,
         'net_amount': net_amount,
-        'transactions': filtered_transactions,
+        'transaction_count': transaction_count,
         'all_transactions': all_transactions,
         'filename': filename
     }
     
-    wb.close()
     return result
 
 
+def add_cell_styles(wb):
+    """Register CELL_STYLES on a new workbook so cells can be styled by name"""
+    # NamedStyles are bound to a single workbook, so build fresh ones every time
+    for name, (font, fill, border, alignment, number_format) in CELL_STYLES.items():
+        wb.add_named_style(NamedStyle(name=name, font=font, fill=fill, border=border or DEFAULT_BORDER,
+                                      alignment=alignment, number_format=number_format or 'General'))
+
+
+def styled_cell(ws, value, style):
+    """Build a write-only cell with one of the CELL_STYLES applied"""
+    # A named style copies one precomputed style array instead of hashing each attribute;
+    # the value is set afterwards so datetimes still pick up their date number format
+    cell = WriteOnlyCell(ws)
+    cell.style = style
+    cell.value = value
+    return cell
+
+
+def write_je_row(ws, values):
+    """Append one 12-column JE line, styling each column per JE_COLUMN_STYLES"""
+    ws.append([styled_cell(ws, value, style) for value, style in zip(values, JE_COLUMN_STYLES)])
+
+
+def append_journal_entry(ws, result):
+    """Append the JE header row and the journal entry lines for result; return the rows added"""
+    ws.append([styled_cell(ws, header, 'header')
+               for header in JE_HEADERS])
+    
+    # Determine JE based on net amount
+    net = result['net_amount']
+    file_month_str = f"{result['file_month']:02d}"
+    file_year_str = str(result['file_year'])
+    memo = f"dLocal Pending Debits {file_month_str}.{file_year_str}"
+    
+    # JE date is the last day of the file month
+    last_day = monthrange(result['file_year'], result['file_month'])[1]
+    je_date = date(result['file_year'], result['file_month'], last_day)
+    
+    # Reversal date (first day of following month); both are shown as m/d/yyyy by the row_date style
+    reversal_date = date(result['following_year'], result['following_month'], 1)
+    
+    if net != 0:
+        amount = abs(net)
+        if net > 0:
+            # Positive: Debit Customer Funds Obligation, Credit Other Current Liabilities
+            je_lines = [(amount, None, JE_ACCOUNTS[0]), (None, amount, JE_ACCOUNTS[1])]
+        else:
+            # Negative: Credit Customer Funds Obligation, Debit Other Current Liabilities
+            je_lines = [(None, amount, JE_ACCOUNTS[0]), (amount, None, JE_ACCOUNTS[1])]
+        
+        for debit, credit, account in je_lines:
+            write_je_row(ws, (debit, credit, je_date, reversal_date, memo, account,
+                              *JE_COMMON, memo, JE_CLASS))
+        return 1 + len(je_lines)
+    
+    else:
+        # Zero amount
+        ws.append([styled_cell(ws, 'No journal entry required (Net Amount = 0)', 'italic')])
+        return 2
+
+
 def create_summary_and_je(result, output_filepath):
     """Create summary table and journal entry in a new Excel file"""
     
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "dLocal Pending Summary"
-    
-    # Styles
-    header_font = Font(name='Calibri', size=11, bold=True, color='000000')
-    normal_font = Font(name='Calibri', size=11, color='000000')
-    border_style = Border(
-        left=Side(style='thin', color='000000'),
-        right=Side(style='thin', color='000000'),
-        top=Side(style='thin', color='000000'),
-        bottom=Side(style='thin', color='000000')
-    )
-    header_fill = PatternFill(start_color='D3D3D3', end_color='D3D3D3', fill_type='solid')
-    center_align = Alignment(horizontal='center', vertical='center')
-    right_align = Alignment(horizontal='right', vertical='center')
+    # Write-only workbooks stream rows to disk instead of keeping every cell in memory
+    wb = openpyxl.Workbook(write_only=True)
+    add_cell_styles(wb)
+    ws = wb.create_sheet("dLocal Pending Summary")
     
-    # Title
-    ws['A1'] = 'dLocal Pending Debits Processing'
-    ws['A1'].font = Font(name='Calibri', size=14, bold=True)
-    ws.merge_cells('A1:F1')
+    # Adjust column widths (write-only sheets need these before the first append)
+    for col, width in COLUMN_WIDTHS:
+        ws.column_dimensions[col].width = width
     
-    # File information
-    month_names = ['', 'January', 'February', 'March', 'April', 'May', 'June',
-                   'July', 'August', 'September', 'October', 'November', 'December']
+    # row is the number of the last appended row; bump it after every append
+    row = 0
     
-    ws['A3'] = f"File Period: {month_names[result['file_month']]} {result['file_year']}"
-    ws['A3'].font = Font(name='Calibri', size=11, bold=True)
+    # Title
+    ws.append([styled_cell(ws, 'dLocal Pending Debits Processing', 'title')])
+    row += 1
+    ws.append([])
+    row += 1
     
-    ws['A4'] = f"Date Processed Filter: {month_names[result['following_month']]} {result['following_year']}"
-    ws['A4'].font = Font(name='Calibri', size=11, bold=True)
+    # File information
+    ws.append([styled_cell(ws, f"File Period: {MONTH_NAMES[result['file_month']]} {result['file_year']}",
+                           'bold')])
+    row += 1
+    ws.append([styled_cell(ws, f"Date Processed Filter: {MONTH_NAMES[result['following_month']]} {result['following_year']}",
+                           'bold')])
+    row += 1
+    ws.append([])
+    row += 1
     
     # All Transactions Table
-    row = 6
-    ws[f'A{row}'] = 'ALL TRANSACTIONS'
-    ws[f'A{row}'].font = header_font
-    ws.merge_cells(f'A{row}:G{row}')
-    
+    ws.append([styled_cell(ws, 'ALL TRANSACTIONS', 'section')])
+    row += 1
+    ws.append([styled_cell(ws, header, 'header')
+               for header in DETAIL_HEADERS])
     row += 1
-    headers_detail = ['Date', 'ACH_DEBIT_AMOUNT', 'ACH_RETURN_AMOUNT', 'Date processed', 'CN', 'DN', 'Net Amount (B-C)']
-    for col_idx, header in enumerate(headers_detail, start=1):
-        cell = ws.cell(row=row, column=col_idx)
-        cell.value = header
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.border = border_style
-        cell.alignment = center_align
-    
-    # Highlight color for following month rows
-    highlight_fill = PatternFill(start_color='FFFF00', end_color='FFFF00', fill_type='solid')  # Yellow
     
     # Add ALL transaction rows from result
     for txn in result['all_transactions']:
-        row += 1
-        ws.cell(row=row, column=1).value = txn['date']
-        
-        # For columns B and C, use actual values or None (not string '-')
-        debit_val = txn['debit'] if txn['debit'] != 0 else None
-        return_val = txn['return'] if txn['return'] != 0 else None
-        
-        ws.cell(row=row, column=2).value = debit_val
-        ws.cell(row=row, column=3).value = return_val
-        ws.cell(row=row, column=4).value = txn['date_processed']
-        ws.cell(row=row, column=5).value = txn.get('cn', '')
-        ws.cell(row=row, column=6).value = txn.get('dn', '')
-        
-        # Add formula for Net Amount (B - C) for rows with following month date processed
-        if txn.get('is_following_month', False):
-            # Use Excel formula: =IFERROR(B{row}-C{row},"")
-            # This handles cases where B or C might be empty
-            formula = f'=IFERROR(B{row}-C{row},"")'
-            ws.cell(row=row, column=7).value = formula
+        # Highlight rows with following month date processed
+        if txn.is_following_month:
+            style, money_style = 'row_highlight', 'row_money_highlight'
         else:
-            ws.cell(row=row, column=7).value = ''
+            style, money_style = 'row', 'row_money'
         
-        for col_idx in range(1, 8):
-            cell = ws.cell(row=row, column=col_idx)
-            cell.font = normal_font
-            cell.border = border_style
-            
-            # Highlight rows with following month date processed
-            if txn.get('is_following_month', False):
-                cell.fill = highlight_fill
-            
-            if col_idx in [2, 3] and cell.value is not None:
-                cell.number_format = '#,##0.00'
-                cell.alignment = right_align
-            elif col_idx == 7:
-                cell.number_format = '#,##0.00'
-                cell.alignment = right_align
+        ws.append([
+            styled_cell(ws, txn.date, style),
+            styled_cell(ws, txn.debit, money_style),
+            styled_cell(ws, txn.return_, money_style),
+            styled_cell(ws, txn.date_processed, style),
+            styled_cell(ws, txn.cn, style),
+            styled_cell(ws, txn.dn, style),
+            styled_cell(ws, txn.net if txn.is_following_month else '', money_style)
+        ])
+        row += 1
     
     # Summary Table
-    row += 2
-    ws[f'A{row}'] = 'SUMMARY'
-    ws[f'A{row}'].font = header_font
-    ws[f'A{row}'].fill = header_fill
-    ws[f'A{row}'].border = border_style
-    ws.merge_cells(f'A{row}:B{row}')
+    ws.append([])
+    row += 1
+    ws.append([styled_cell(ws, 'SUMMARY', 'section_boxed')])
+    row += 1
+    # Plain titles simply overflow into the empty cells to their right; only this
+    # filled, boxed heading needs a merge
+    ws.merged_cells.add(f'A{row}:B{row}')
     
+    ws.append([styled_cell(ws, header, 'header')
+               for header in ('Description', 'Amount')])
     row += 1
-    ws[f'A{row}'] = 'Description'
-    ws[f'B{row}'] = 'Amount'
-    for col in ['A', 'B']:
-        ws[f'{col}{row}'].font = header_font
-        ws[f'{col}{row}'].fill = header_fill
-        ws[f'{col}{row}'].border = border_style
-        ws[f'{col}{row}'].alignment = center_align
     
+    ws.append([
+        styled_cell(ws, 'Total ACH Debit Amount', 'row'),
+        styled_cell(ws, result['total_debit'], 'row_money')
+    ])
     row += 1
-    ws[f'A{row}'] = 'Total ACH Debit Amount'
-    ws[f'B{row}'] = result['total_debit']
-    ws[f'A{row}'].font = normal_font
-    ws[f'A{row}'].border = border_style
-    ws[f'B{row}'].font = normal_font
-    ws[f'B{row}'].border = border_style
-    ws[f'B{row}'].number_format = '#,##0.00'
-    ws[f'B{row}'].alignment = right_align
     
+    ws.append([
+        styled_cell(ws, 'Total ACH Return Amount', 'row'),
+        styled_cell(ws, result['total_return'], 'row_money')
+    ])
     row += 1
-    ws[f'A{row}'] = 'Total ACH Return Amount'
-    ws[f'B{row}'] = result['total_return']
-    ws[f'A{row}'].font = normal_font
-    ws[f'A{row}'].border = border_style
-    ws[f'B{row}'].font = normal_font
-    ws[f'B{row}'].border = border_style
-    ws[f'B{row}'].number_format = '#,##0.00'
-    ws[f'B{row}'].alignment = right_align
     
+    ws.append([
+        styled_cell(ws, 'Net Amount (Debit - Return)', 'total'),
+        styled_cell(ws, result['net_amount'], 'total_money')
+    ])
     row += 1
-    ws[f'A{row}'] = 'Net Amount (Debit - Return)'
-    ws[f'B{row}'] = result['net_amount']
-    ws[f'A{row}'].font = Font(name='Calibri', size=11, bold=True)
-    ws[f'A{row}'].border = border_style
-    ws[f'A{row}'].fill = PatternFill(start_color='E8E8E8', end_color='E8E8E8', fill_type='solid')
-    ws[f'B{row}'].font = Font(name='Calibri', size=11, bold=True)
-    ws[f'B{row}'].border = border_style
-    ws[f'B{row}'].number_format = '#,##0.00'
-    ws[f'B{row}'].alignment = right_align
-    ws[f'B{row}'].fill = PatternFill(start_color='E8E8E8', end_color='E8E8E8', fill_type='solid')
     
     # Journal Entry
-    row += 3
-    ws[f'A{row}'] = 'JOURNAL ENTRY'
-    ws[f'A{row}'].font = Font(name='Calibri', size=12, bold=True)
-    ws.merge_cells(f'A{row}:L{row}')
-    
+    ws.append([])
+    row += 1
+    ws.append([])
+    row += 1
+    ws.append([styled_cell(ws, 'JOURNAL ENTRY', 'je_title')])
     row += 1
-    je_headers = ['Debit', 'Credit', 'Date', 'Reversal Date', 'Memo', 'Account', 
-                  'Department', 'Location', 'Name', 'Subsidiary', 'Journal Entry : Memo', 'Class']
-    for col_idx, header in enumerate(je_headers, start=1):
-        cell = ws.cell(row=row, column=col_idx)
-        cell.value = header
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.border = border_style
-        cell.alignment = center_align
-    
-    # Determine JE based on net amount
-    net = result['net_amount']
-    file_month_str = f"{result['file_month']:02d}"
-    file_year_str = str(result['file_year'])
-    memo = f"dLocal Pending Debits {file_month_str}.{file_year_str}"
-    
-    # Get the last day of the file month
-    if result['file_month'] == 12:
-        last_day_month = 12
-        last_day_year = result['file_year']
-    else:
-        last_day_month = result['file_month']
-        last_day_year = result['file_year']
-    
-    # Calculate last day
-    from calendar import monthrange
-    last_day = monthrange(last_day_year, last_day_month)[1]
-    date_str = f"{last_day_month}/{last_day}/{last_day_year}"
-    
-    # Reversal date (first day of following month)
-    reversal_date_str = f"{result['following_month']}/1/{result['following_year']}"
-    
-    if net > 0:
-        # Positive: Debit Customer Funds Obligation, Credit Other Current Liabilities
-        # Line 1: Debit Customer Funds Obligation (Debit column A)
-        row += 1
-        ws.cell(row=row, column=1).value = abs(net)  # Debit
-        ws.cell(row=row, column=2).value = None  # Credit (empty)
-        ws.cell(row=row, column=3).value = date_str
-        ws.cell(row=row, column=4).value = reversal_date_str
-        ws.cell(row=row, column=5).value = memo
-        ws.cell(row=row, column=6).value = '22010 - Customer Funds Obligation : Customer Funds Liability'
-        ws.cell(row=row, column=7).value = '0000 Corporate'
-        ws.cell(row=row, column=8).value = '1 San Francisco'
-        ws.cell(row=row, column=9).value = None  # Name is empty
-        ws.cell(row=row, column=10).value = 'Gusto Inc Global : Gusto Inc US'
-        ws.cell(row=row, column=11).value = memo
-        ws.cell(row=row, column=12).value = '601 Horizontal'
-        
-        for col_idx in range(1, 13):
-            cell = ws.cell(row=row, column=col_idx)
-            cell.font = normal_font
-            cell.border = border_style
-            if col_idx in [1, 2]:
-                cell.number_format = '#,##0.00'
-                cell.alignment = right_align
-        
-        # Line 2: Credit Other Current Liabilities (Credit column B)
-        row += 1
-        ws.cell(row=row, column=1).value = None  # Debit (empty)
-        ws.cell(row=row, column=2).value = abs(net)  # Credit
-        ws.cell(row=row, column=3).value = date_str
-        ws.cell(row=row, column=4).value = reversal_date_str
-        ws.cell(row=row, column=5).value = memo
-        ws.cell(row=row, column=6).value = '21017 - Other Current Liabilities : Accrued Liabilities - Platform'
-        ws.cell(row=row, column=7).value = '0000 Corporate'
-        ws.cell(row=row, column=8).value = '1 San Francisco'
-        ws.cell(row=row, column=9).value = None  # Name is empty
-        ws.cell(row=row, column=10).value = 'Gusto Inc Global : Gusto Inc US'
-        ws.cell(row=row, column=11).value = memo
-        ws.cell(row=row, column=12).value = '601 Horizontal'
-        
-        for col_idx in range(1, 13):
-            cell = ws.cell(row=row, column=col_idx)
-            cell.font = normal_font
-            cell.border = border_style
-            if col_idx in [1, 2]:
-                cell.number_format = '#,##0.00'
-                cell.alignment = right_align
-    
-    elif net < 0:
-        # Negative: Credit Customer Funds Obligation, Debit Other Current Liabilities
-        # Line 1: Credit Customer Funds Obligation (Credit column B)
-        row += 1
-        ws.cell(row=row, column=1).value = None  # Debit (empty)
-        ws.cell(row=row, column=2).value = abs(net)  # Credit
-        ws.cell(row=row, column=3).value = date_str
-        ws.cell(row=row, column=4).value = reversal_date_str
-        ws.cell(row=row, column=5).value = memo
-        ws.cell(row=row, column=6).value = '22010 - Customer Funds Obligation : Customer Funds Liability'
-        ws.cell(row=row, column=7).value = '0000 Corporate'
-        ws.cell(row=row, column=8).value = '1 San Francisco'
-        ws.cell(row=row, column=9).value = None  # Name is empty
-        ws.cell(row=row, column=10).value = 'Gusto Inc Global : Gusto Inc US'
-        ws.cell(row=row, column=11).value = memo
-        ws.cell(row=row, column=12).value = '601 Horizontal'
-        
-        for col_idx in range(1, 13):
-            cell = ws.cell(row=row, column=col_idx)
-            cell.font = normal_font
-            cell.border = border_style
-            if col_idx in [1, 2]:
-                cell.number_format = '#,##0.00'
-                cell.alignment = right_align
-        
-        # Line 2: Debit Other Current Liabilities (Debit column A)
-        row += 1
-        ws.cell(row=row, column=1).value = abs(net)  # Debit
-        ws.cell(row=row, column=2).value = None  # Credit (empty)
-        ws.cell(row=row, column=3).value = date_str
-        ws.cell(row=row, column=4).value = reversal_date_str
-        ws.cell(row=row, column=5).value = memo
-        ws.cell(row=row, column=6).value = '21017 - Other Current Liabilities : Accrued Liabilities - Platform'
-        ws.cell(row=row, column=7).value = '0000 Corporate'
-        ws.cell(row=row, column=8).value = '1 San Francisco'
-        ws.cell(row=row, column=9).value = None  # Name is empty
-        ws.cell(row=row, column=10).value = 'Gusto Inc Global : Gusto Inc US'
-        ws.cell(row=row, column=11).value = memo
-        ws.cell(row=row, column=12).value = '601 Horizontal'
-        
-        for col_idx in range(1, 13):
-            cell = ws.cell(row=row, column=col_idx)
-            cell.font = normal_font
-            cell.border = border_style
-            if col_idx in [1, 2]:
-                cell.number_format = '#,##0.00'
-                cell.alignment = right_align
     
-    else:
-        # Zero amount
-        row += 1
-        ws[f'A{row}'] = 'No journal entry required (Net Amount = 0)'
-        ws[f'A{row}'].font = Font(name='Calibri', size=11, italic=True)
-    
-    # Adjust column widths
-    ws.column_dimensions['A'].width = 12  # Date
-    ws.column_dimensions['B'].width = 20  # ACH_DEBIT_AMOUNT
-    ws.column_dimensions['C'].width = 20  # ACH_RETURN_AMOUNT
-    ws.column_dimensions['D'].width = 18  # Date processed
-    ws.column_dimensions['E'].width = 15  # CN
-    ws.column_dimensions['F'].width = 15  # DN
-    ws.column_dimensions['G'].width = 20  # Net Amount (B-C)
-    ws.column_dimensions['H'].width = 18
-    ws.column_dimensions['I'].width = 35
-    ws.column_dimensions['J'].width = 15
-    ws.column_dimensions['K'].width = 35
-    ws.column_dimensions['L'].width = 15
+    row += append_journal_entry(ws, result)
     
     # Save workbook
     wb.save(output_filepath)
@@ -523,10 +513,11 @@ def main():
     print(f"\nTotal ACH Debit Amount: ${result['total_debit']:,.2f}")
     print(f"Total ACH Return Amount: ${result['total_return']:,.2f}")
     print(f"Net Amount: ${result['net_amount']:,.2f}")
-    print(f"Number of transactions filtered: {len(result['transactions'])}")
+    print(f"Number of transactions filtered: {result['transaction_count']}")
     
-    # Generate output filename
-    output_file = input_file.replace('.xlsx', '_Summary_JE.xlsx')
+    # Generate output filename (from the stem, so a .xls input is never overwritten)
+    input_path = Path(input_file)
+    output_file = str(input_path.with_name(f"{input_path.stem}_Summary_JE.xlsx"))
     
     # Create summary and JE
     create_summary_and_je(result, output_file)